@@ -1,19 +1,28 @@
 """Main module to synchronize .pre-commit-config.yaml with uv.lock."""
 
 import argparse
+import hashlib
 import json
+import os
 import re
+import sys
+import time
 from collections.abc import Sequence
 from pathlib import Path
-from string import Template
-
-import yaml
-from tomlkit.items import AoT
-from tomlkit.toml_file import TOMLFile
+from typing import TYPE_CHECKING, Any
 
 from sync_with_uv.db import DEPENDENCY_MAPPING
 
+if TYPE_CHECKING:
+    from tomlkit.items import AoT
+
+    from sync_with_uv.template import Renderer
+
+# yaml, tomlkit and the template engine are imported where they are used, so
+# that runs skipped by the stamp check in `main` don't pay for their import.
+
 YAML_FILE = ".pre-commit-config.yaml"
+STAMP_MAX_AGE = 30 * 24 * 60 * 60  # 30 days
 REV_LINE_RE = re.compile(
     r'^(\s+)rev:(\s*)(?P<quotes>[\'"]?)(?P<rev>[^\s#]+)(?P=quotes)(\s*)(# frozen: (?P<comment>\S+)\b)?(?P<rest>.*?)(?P<eol>\r?\n)$'  # noqa: E501
 )
@@ -23,41 +32,61 @@ ADD_DEP_RE = re.compile(
 )
 
 
+class _LockedRepo:
+    """A compact record of a repo to sync, as resolved from uv.lock."""
+
+    __slots__ = ("name", "rev")
+
+    def __init__(self, name: str, rev: str) -> None:
+        self.name = name
+        self.rev = rev
+
+
 class UVItems:
     """A class to get and filter uv.lock packages to sync in .pre-commit-config.yaml."""
 
+    __slots__ = ("_uv_lock", "version")
+
     def __init__(
         self,
-        uv_list: AoT,
+        uv_list: "AoT",
         skip: list[str] | None = None,
-        db: dict[str, dict[str, str]] = DEPENDENCY_MAPPING,
+        db: dict[str, dict[str, Any]] = DEPENDENCY_MAPPING,
+        revs: "dict[str, Renderer] | None" = None,
     ) -> None:
         """Create a UVItems collection.
 
+        Only plain, interned strings are kept, so that no reference to the
+        tomlkit document survives and it can be released once the index is built.
+
         Args:
             uv_list: a list of packages coming from uv.lock.
             skip: A list of packages to skip. Such packages won't
                 be synchronized in .pre-commit-config.yaml.
             db: A package-repo mapping.
+            revs: The `rev` renderers of the mapping, as returned by
+                `compile_db(db)`. Compiled on the fly if not given.
         """
-        if skip is None:
-            skip = []
+        if revs is None:
+            from sync_with_uv.template import compile_db
+
+            revs = compile_db(db)
+        skipped = frozenset(skip or ())
 
-        self._uv_lock = {}
-        self.version = {}
+        self._uv_lock: dict[str, _LockedRepo] = {}
+        self.version: dict[str, str] = {}
         for package in uv_list:
-            self.version[package["name"].lower().replace("_", "-")] = package["version"]
-            if package["name"] in skip:
+            name = sys.intern(str(package["name"]))
+            version = sys.intern(str(package["version"]))
+            self.version[sys.intern(name.lower().replace("_", "-"))] = version
+            if name in skipped:
                 continue
 
-            dependency_mapping = db.get(package["name"])
+            dependency_mapping = db.get(name)
             if dependency_mapping:
-                name = package["name"]
-                repo = dependency_mapping["repo"]
-                rev = Template(dependency_mapping["rev"]).substitute(
-                    rev=package["version"]
-                )
-                self._uv_lock[repo] = {"name": name, "rev": rev}
+                repo = sys.intern(dependency_mapping["repo"])
+                rev = revs[name](version)
+                self._uv_lock[repo] = _LockedRepo(name, rev)
 
     def get_by_repo(self, repo: str) -> dict[str, str] | None:
         """Get a PreCommitRepo given its url.
@@ -69,7 +98,29 @@ class UVItems:
             A dictionary representing a repo data (name and version)
             e.g., {'name': 'black', 'rev': '22.8.0'}.
         """
-        return self._uv_lock.get(repo)
+        locked = self._uv_lock.get(repo)
+        if locked is None:
+            return None
+        return {"name": locked.name, "rev": locked.rev}
+
+
+def _load_uv_items(
+    filepath: Path,
+    skip: list[str] | None,
+    db: dict[str, dict[str, Any]],
+    revs: "dict[str, Renderer] | None" = None,
+) -> UVItems:
+    """Build the UVItems index of a uv.lock file.
+
+    The parsed document is local to this function, so it is freed as soon as
+    the index is returned instead of living for the whole synchronization.
+    """
+    from tomlkit.items import AoT
+    from tomlkit.toml_file import TOMLFile
+
+    content = TOMLFile(filepath).read()
+    assert isinstance(content["package"], AoT)
+    return UVItems(content["package"], skip, db, revs)
 
 
 def sync_repos(
@@ -77,19 +128,18 @@ def sync_repos(
     skip: list[str] | None = None,
     config: str = YAML_FILE,
     additional_dependencies: bool = True,
-    db: dict[str, dict[str, str]] = DEPENDENCY_MAPPING,
+    db: dict[str, dict[str, Any]] = DEPENDENCY_MAPPING,
     frozen: bool = False,
+    revs: "dict[str, Renderer] | None" = None,
 ) -> int:
     """Synchronize the .pre-commit-config.yaml with uv.lock file."""
+    import yaml
+
     if skip is None:
         skip = []
     retv = 0
 
-    toml = TOMLFile(filepath)
-    content = toml.read()
-
-    assert isinstance(content["package"], AoT)
-    uv_items = UVItems(content["package"], skip, db)
+    uv_items = _load_uv_items(filepath, skip, db, revs)
 
     with Path(config).open("r") as stream:
         pre_commit_data = yaml.safe_load(stream)
@@ -155,6 +205,66 @@ def sync_repos(
     return retv
 
 
+def _cache_dir() -> Path:
+    """Return the directory where run stamps are stored."""
+    cache_home = os.environ.get("XDG_CACHE_HOME")
+    base = Path(cache_home) if cache_home else Path.home() / ".cache"
+    return base / "sync-with-uv"
+
+
+def _stamp(config: Path, paths: list[Path], options: dict) -> tuple[Path, dict] | None:
+    """Compute the stamp of a run and the file it is stored in.
+
+    A stamp holds the content hash of every input file along with the options
+    that affect the output. Hashes, unlike mtimes, can't miss a same-size
+    rewrite within the filesystem's timestamp granularity. There is one stamp
+    file per config file. Returns None if any input cannot be read.
+
+    Args:
+        config: The .pre-commit-config.yaml file of the run.
+        paths: The files the run reads (lock files, config and mapping).
+        options: The command-line options the output depends on.
+
+    Returns:
+        A (stamp file, stamp) tuple, or None.
+    """
+    files = {}
+    for path in paths:
+        try:
+            files[str(path.resolve())] = hashlib.sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+    key = hashlib.sha256(str(config.resolve()).encode()).hexdigest()
+    return _cache_dir() / f"{key}.json", {"files": files, "options": options}
+
+
+def _is_up_to_date(stamp_file: Path, stamp: dict) -> bool:
+    """Check whether a stamp matches the one stored by the previous run."""
+    try:
+        with stamp_file.open("r") as f:
+            return json.load(f) == stamp
+    except (OSError, ValueError):
+        return False
+
+
+def _save_stamp(stamp_file: Path, stamp: dict) -> None:
+    """Store a run stamp, ignoring failures (e.g., a read-only cache).
+
+    Stamps not refreshed for STAMP_MAX_AGE seconds (e.g., those of removed
+    checkouts or temporary CI paths) are pruned.
+    """
+    try:
+        stamp_file.parent.mkdir(parents=True, exist_ok=True)
+        with stamp_file.open("w") as f:
+            json.dump(stamp, f)
+        expired = time.time() - STAMP_MAX_AGE
+        for path in stamp_file.parent.glob("*.json"):
+            if path.stat().st_mtime < expired:
+                path.unlink()
+    except OSError:
+        pass
+
+
 def main(argv: Sequence[str] | None = None) -> int:
     """Main function to parse arguments and call sync_repos."""
     parser = argparse.ArgumentParser()
@@ -191,12 +301,39 @@ def main(argv: Sequence[str] | None = None) -> int:
         type=str,
         help="Path to a custom package list (json)",
     )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Always sync, even if uv.lock, the config and the package list "
+        "are unchanged since the last run.",
+    )
     args = parser.parse_args(argv)
+
+    inputs = [Path(filename) for filename in args.filenames]
+    inputs.append(Path(args.config))
+    if args.db is not None:
+        inputs.append(Path(args.db))
+    # stamp our own code too, so upgrades and editable installs are not skipped
+    inputs.extend(sorted(Path(__file__).parent.glob("*.py")))
+    options = {
+        "skip": sorted(args.skip),
+        "frozen": args.frozen,
+        "additional_dependencies": args.additional_dependencies,
+    }
+    config = Path(args.config)
+    stamped = None if args.force else _stamp(config, inputs, options)
+    if stamped is not None and _is_up_to_date(*stamped):
+        return 0
+
     if args.db is None:
         mapping = DEPENDENCY_MAPPING
     else:
         with Path(args.db).open("r") as f:
             mapping = json.load(f)
+    from sync_with_uv.template import compile_db
+
+    # compile the mapping once for all the lock files
+    revs = compile_db(mapping)
     retv = 0
     for filename in args.filenames:
         retv |= sync_repos(
@@ -206,7 +343,13 @@ def main(argv: Sequence[str] | None = None) -> int:
             additional_dependencies=args.additional_dependencies,
             db=mapping,
             frozen=args.frozen,
+            revs=revs,
         )
+
+    # sync_repos rewrites the config, so stamp the inputs after the run.
+    stamped = _stamp(config, inputs, options)
+    if stamped is not None:
+        _save_stamp(*stamped)
     return retv
 
 
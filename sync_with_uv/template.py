@@ -0,0 +1,371 @@
+"""Revision templates to render a repo `rev` from a package version.
+
+Mapping entries are compiled once into renderers. The template language
+(placeholders, `transforms` and `overrides`) is documented in the README.
+"""
+
+import re
+from collections.abc import Callable
+from string import Template
+from typing import Any
+
+# source: https://peps.python.org/pep-0440/#appendix-b-parsing-version-strings-with-regular-expressions
+VERSION_RE = re.compile(
+    r"^\s*v?"
+    r"(?:(?P<epoch>[0-9]+)!)?"
+    r"(?P<release>[0-9]+(?:\.[0-9]+)*)"
+    r"(?P<pre>[-_.]?(?P<pre_l>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_n>[0-9]+)?)?"
+    r"(?P<post>(?:-(?P<post_n1>[0-9]+))|(?:[-_.]?(?P<post_l>post|rev|r)[-_.]?(?P<post_n2>[0-9]+)?))?"
+    r"(?P<dev>[-_.]?(?P<dev_l>dev)[-_.]?(?P<dev_n>[0-9]+)?)?"
+    r"(?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?"
+    r"\s*$",
+    re.IGNORECASE,
+)
+SPECIFIER_RE = re.compile(r"^\s*(?P<op>==|!=|<=|>=|<|>)\s*(?P<version>[^\s,]+)\s*$")
+PRE_RANKS = {"a": 0, "alpha": 0, "b": 1, "beta": 1}
+FINAL = (3, 0)  # the pre-release component of a version key for final releases
+NO_DEV = (1, 0)  # the dev-release component of a version key for non-dev releases
+
+OVERRIDE_KEYS = frozenset({"versions", "prerelease", "rev", "transforms"})
+TRANSFORM_KEYS = frozenset({"pattern", "replace"})
+PLACEHOLDERS = frozenset(
+    {"rev", "public", "base", "major", "minor", "micro", "pre", "post", "dev", "local"}
+)
+
+Renderer = Callable[[str], str]
+VersionKey = tuple[int, tuple[int, ...], tuple[int, int], int, tuple[int, int]]
+
+
+class RevTemplateError(ValueError):
+    """A package mapping entry cannot be compiled or rendered."""
+
+    def __init__(self, repo: str, reason: str) -> None:
+        """Create the error for the entry of the given repo."""
+        super().__init__(f"Invalid rev template for {repo}: {reason}")
+
+
+class InvalidSpecifierError(RevTemplateError):
+    """A version specifier of a `rev` override cannot be parsed."""
+
+    def __init__(self, repo: str, specifier: str) -> None:
+        """Create the error for the given specifier."""
+        super().__init__(repo, f"invalid version specifier {specifier!r}")
+
+
+class UnknownKeysError(RevTemplateError):
+    """A mapping entry, override or transform has unexpected keys."""
+
+    def __init__(self, repo: str, where: str, keys: set[str]) -> None:
+        """Create the error for the given keys."""
+        super().__init__(repo, f"unknown {where} keys {sorted(keys)}")
+
+
+class InvalidTransformError(RevTemplateError):
+    """A transform pattern or replacement is not valid."""
+
+    def __init__(self, repo: str, transform: dict, error: Exception) -> None:
+        """Create the error for the given transform."""
+        super().__init__(repo, f"invalid transform {transform!r} ({error})")
+
+
+class InvalidTypeError(RevTemplateError):
+    """A mapping entry value is not of the expected type."""
+
+    def __init__(self, repo: str, key: str, expected: type) -> None:
+        """Create the error for the given key."""
+        super().__init__(repo, f"{key!r} must be a {expected.__name__}")
+
+
+class InvalidPlaceholderError(RevTemplateError):
+    """A `rev` template uses placeholders that cannot be rendered."""
+
+    def __init__(self, repo: str, template: str, version: str | None = None) -> None:
+        """Create the error for the given template (and version, if any)."""
+        if version is None:
+            reason = f"invalid placeholders in {template!r}"
+        else:
+            reason = f"{template!r} needs a PEP 440 version, got {version!r}"
+        super().__init__(repo, reason)
+
+
+def _parse(version: str) -> re.Match[str] | None:
+    """Parse a PEP 440 version."""
+    return VERSION_RE.match(version)
+
+
+def _fields(version: str) -> dict[str, str]:
+    """Return the template placeholders of a version.
+
+    Versions that are not PEP 440 compliant only provide `${rev}`.
+    """
+    match = _parse(version)
+    if match is None:
+        return {"rev": version}
+    release = match["release"].split(".")
+    release += ["0"] * (3 - len(release))
+    return {
+        "rev": version,
+        "public": version.split("+", 1)[0],
+        "base": match["release"],
+        "major": release[0],
+        "minor": release[1],
+        "micro": release[2],
+        "pre": (match["pre"] or "").lstrip("-_."),
+        "post": (match["post"] or "").lstrip("-_."),
+        "dev": (match["dev"] or "").lstrip("-_."),
+        "local": match["local"] or "",
+    }
+
+
+def _key(match: re.Match[str]) -> VersionKey:
+    """Return a key to sort parsed versions following PEP 440 (ignoring local)."""
+    release = tuple(int(i) for i in match["release"].split("."))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    if match["pre_l"]:
+        pre = (PRE_RANKS.get(match["pre_l"].lower(), 2), int(match["pre_n"] or 0))
+    elif match["dev_l"] and not match["post"]:
+        pre = (-1, 0)  # X.Y.devN sorts before X.YaN
+    else:
+        pre = FINAL  # final releases sort after any pre-release
+    post = match["post_n1"] or match["post_n2"]
+    if post is None:
+        post = -1 if not match["post_l"] else 0
+    dev = (0, int(match["dev_n"] or 0)) if match["dev_l"] else NO_DEV
+    return int(match["epoch"] or 0), release, pre, int(post), dev
+
+
+def _is_prerelease(key: VersionKey) -> bool:
+    """Tell whether a version key is a pre-release or a development release."""
+    return key[2] != FINAL or key[4] != NO_DEV
+
+
+def _is_postrelease(key: VersionKey) -> bool:
+    """Tell whether a version key is a post-release."""
+    return key[3] != -1
+
+
+def _satisfies(key: VersionKey, op: str, other: VersionKey) -> bool:
+    """Tell whether a version key satisfies a single specifier clause."""
+    if op == "==":
+        return key == other
+    if op == "!=":
+        return key != other
+    if op == "<=":
+        return key <= other
+    if op == ">=":
+        return key >= other
+    same_release = key[:2] == other[:2]
+    if op == "<":
+        if same_release and _is_prerelease(key) and not _is_prerelease(other):
+            return False
+        return key < other
+    if same_release and _is_postrelease(key) and not _is_postrelease(other):
+        return False
+    return key > other
+
+
+def _compile_specifier(repo: str, specifier: str) -> Callable[[VersionKey], bool]:
+    """Compile a comma-separated PEP 440 version specifier into a predicate.
+
+    As in PEP 440, `<V` excludes the pre-releases of V and `>V` excludes the
+    post-releases of V, unless V is itself a pre-release or a post-release.
+
+    Args:
+        repo: The repo of the mapping entry, for error reporting.
+        specifier: A version specifier, e.g., `>=1.0,<2`.
+
+    Returns:
+        A function telling whether a version key satisfies the specifier.
+    """
+    clauses = []
+    for clause in specifier.split(","):
+        spec_match = SPECIFIER_RE.match(clause)
+        version_match = spec_match and _parse(spec_match["version"])
+        if not spec_match or not version_match:
+            raise InvalidSpecifierError(repo, specifier)
+        clauses.append((spec_match["op"], _key(version_match)))
+
+    def _contains(key: VersionKey) -> bool:
+        return all(_satisfies(key, op, other) for op, other in clauses)
+
+    return _contains
+
+
+def _check_keys(repo: str, where: str, mapping: dict, allowed: frozenset) -> None:
+    """Reject the keys of a mapping that are not allowed."""
+    unknown = set(mapping) - allowed
+    if unknown:
+        raise UnknownKeysError(repo, where, unknown)
+
+
+def _check_type(repo: str, key: str, value: object, expected: type) -> None:
+    """Reject a value that is not of the expected type."""
+    if not isinstance(value, expected):
+        raise InvalidTypeError(repo, key, expected)
+
+
+def _to_format(repo: str, rev: str) -> tuple[str, set[str]]:
+    """Translate a `string.Template` into a `str.format` string.
+
+    Formatting is several times faster than `Template.substitute`.
+
+    Args:
+        repo: The repo of the mapping entry, for error reporting.
+        rev: The `rev` template, e.g., `v${rev}`.
+
+    Returns:
+        The format string and the placeholders it uses.
+    """
+    identifiers = set()
+    parts = []
+    end = 0
+    for match in Template.pattern.finditer(rev):
+        parts.append(rev[end : match.start()].replace("{", "{{").replace("}", "}}"))
+        end = match.end()
+        if match["invalid"] is not None:
+            raise InvalidPlaceholderError(repo, rev)
+        if match["escaped"] is not None:
+            parts.append("$")
+            continue
+        identifier = match["named"] or match["braced"]
+        if identifier not in PLACEHOLDERS:
+            raise InvalidPlaceholderError(repo, rev)
+        identifiers.add(identifier)
+        parts.append(f"{{{identifier}}}")
+    parts.append(rev[end:].replace("{", "{{").replace("}", "}}"))
+    return "".join(parts), identifiers
+
+
+def _compile_transform(repo: str, transform: object) -> tuple[re.Pattern, str]:
+    """Compile a `{"pattern": ..., "replace": ...}` transform."""
+    _check_type(repo, "transforms", transform, dict)
+    assert isinstance(transform, dict)
+    _check_keys(repo, "transform", transform, TRANSFORM_KEYS)
+    pattern = transform.get("pattern")
+    replace = transform.get("replace", "")
+    _check_type(repo, "pattern", pattern, str)
+    _check_type(repo, "replace", replace, str)
+    try:
+        compiled = re.compile(pattern)
+        # the replacement is parsed, and its group references checked, even
+        # if nothing matches
+        compiled.sub(replace, "")
+    except (re.error, IndexError) as e:
+        raise InvalidTransformError(repo, transform, e) from e
+    return compiled, replace
+
+
+def _compile_rev(repo: str, rev: object, transforms: object) -> Renderer:
+    """Compile a `rev` template and its transforms into a renderer.
+
+    Args:
+        repo: The repo of the mapping entry, for error reporting.
+        rev: The `rev` template, e.g., `v${rev}`.
+        transforms: A list of `{"pattern": ..., "replace": ...}` regex
+            substitutions applied, in order, to the rendered `rev`.
+
+    Returns:
+        A function rendering the `rev` of a version.
+    """
+    _check_type(repo, "rev", rev, str)
+    _check_type(repo, "transforms", transforms, list)
+    assert isinstance(rev, str)
+    assert isinstance(transforms, list)
+    template, identifiers = _to_format(repo, rev)
+    only_rev = identifiers <= {"rev"}
+    substitutions = [_compile_transform(repo, transform) for transform in transforms]
+
+    def _render(version: str) -> str:
+        if only_rev:
+            rendered = template.format(rev=version)
+        else:
+            fields = _fields(version)
+            if len(fields) == 1:
+                raise InvalidPlaceholderError(repo, rev, version)
+            rendered = template.format_map(fields)
+        for pattern, replace in substitutions:
+            rendered = pattern.sub(replace, rendered)
+        return rendered
+
+    return _render
+
+
+def _compile_override(
+    repo: str, override: object, rev: object, transforms: object
+) -> tuple[Callable[[VersionKey], bool] | None, bool | None, Renderer]:
+    """Compile an override into its version predicate, flag and renderer."""
+    _check_type(repo, "overrides", override, dict)
+    assert isinstance(override, dict)
+    _check_keys(repo, "override", override, OVERRIDE_KEYS)
+    versions = override.get("versions")
+    prerelease = override.get("prerelease")
+    if versions is not None:
+        _check_type(repo, "versions", versions, str)
+    if prerelease is not None:
+        _check_type(repo, "prerelease", prerelease, bool)
+    return (
+        _compile_specifier(repo, versions) if versions else None,
+        prerelease,
+        _compile_rev(
+            repo, override.get("rev", rev), override.get("transforms", transforms)
+        ),
+    )
+
+
+def compile_rev(mapping: dict[str, Any]) -> Renderer:
+    """Compile the `rev` of a mapping entry into a renderer.
+
+    Keys other than `repo`, `rev`, `transforms` and `overrides` are ignored.
+
+    Args:
+        mapping: A package mapping entry, with a `repo`, a `rev` template and
+            optional `transforms` and `overrides`.
+
+    Returns:
+        A function rendering the `rev` of a version.
+
+    Raises:
+        RevTemplateError: If the entry cannot be compiled, or if the returned
+            renderer is given a version its template cannot render.
+    """
+    repo = mapping["repo"]
+    rev = mapping["rev"]
+    transforms = mapping.get("transforms", [])
+    render = _compile_rev(repo, rev, transforms)
+    overrides_list = mapping.get("overrides", [])
+    _check_type(repo, "overrides", overrides_list, list)
+    overrides = [
+        _compile_override(repo, override, rev, transforms)
+        for override in overrides_list
+    ]
+    if not overrides:
+        return render
+
+    def _render(version: str) -> str:
+        match = _parse(version)
+        if match is None:
+            return render(version)
+        key = _key(match)
+        prerelease = _is_prerelease(key)
+        for contains, is_prerelease, override in overrides:
+            if contains is not None and not contains(key):
+                continue
+            if is_prerelease is not None and is_prerelease != prerelease:
+                continue
+            return override(version)
+        return render(version)
+
+    return _render
+
+
+def compile_db(db: dict[str, dict[str, Any]]) -> dict[str, Renderer]:
+    """Compile the `rev` of every entry of a package mapping.
+
+    Args:
+        db: A package-repo mapping.
+
+    Returns:
+        A package-renderer mapping, to be reused across uv.lock files.
+    """
+    return {name: compile_rev(mapping) for name, mapping in db.items()}
@@ -0,0 +1,147 @@
+"""Test skipping runs whose inputs are unchanged since the last run."""
+
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from sync_with_uv import main
+from tests.helpers import CONFIG_CONTENT, LOCK_CONTENT
+
+
+@pytest.fixture
+def files(tmpdir: Path, monkeypatch: pytest.MonkeyPatch) -> tuple[Path, Path]:
+    """Create a lock and a config file, and an isolated cache directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "cache"))
+    lock_file = tmpdir / "uv.lock"
+    with lock_file.open("w") as f:
+        f.write(LOCK_CONTENT)
+    config_file = tmpdir / ".pre-commit-yaml"
+    with config_file.open("w") as f:
+        f.write(CONFIG_CONTENT)
+    return lock_file, config_file
+
+
+def _run(files: tuple[Path, Path], *args: str) -> int:
+    lock_file, config_file = files
+    return main.main([str(lock_file), "--config", str(config_file), *args])
+
+
+def _record_calls(monkeypatch: pytest.MonkeyPatch) -> list[dict]:
+    """Replace sync_repos with a recorder of its calls."""
+    calls: list[dict] = []
+
+    def _sync_repos(**kwargs: object) -> int:
+        calls.append(kwargs)
+        return 0
+
+    monkeypatch.setattr(main, "sync_repos", _sync_repos)
+    return calls
+
+
+def test_unchanged_inputs_are_skipped(
+    files: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a second run over the same inputs does not parse anything."""
+    assert _run(files) == 1
+    calls = _record_calls(monkeypatch)
+    assert _run(files) == 0
+    assert calls == []
+
+
+def test_changed_inputs_are_synced(
+    files: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a change to the lock, the config or the options triggers a full run."""
+    lock_file, config_file = files
+    assert _run(files) == 1
+    calls = _record_calls(monkeypatch)
+
+    with config_file.open("a") as f:
+        f.write("# changed\n")
+    _run(files)
+    assert len(calls) == 1
+
+    with lock_file.open("a") as f:
+        f.write("# changed\n")
+    _run(files)
+    assert len(calls) == 2
+
+    _run(files, "--skip", "mypy")
+    assert len(calls) == 3
+    assert calls[-1]["skip"] == ["mypy"]
+
+    _run(files, "--skip", "mypy")
+    assert len(calls) == 3
+
+
+def test_same_size_rewrite(
+    files: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test a same-size rewrite of uv.lock keeping its mtime is not skipped."""
+    lock_file, _ = files
+    assert _run(files) == 1
+    calls = _record_calls(monkeypatch)
+
+    stat = Path(lock_file).stat()
+    content = LOCK_CONTENT.replace('version = "4.0.1"', 'version = "4.0.2"')
+    assert len(content) == len(LOCK_CONTENT)
+    with lock_file.open("w") as f:
+        f.write(content)
+    os.utime(lock_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    _run(files)
+    assert len(calls) == 1
+
+
+def test_stamp_files(files: tuple[Path, Path], tmpdir: Path) -> None:
+    """Test there is one stamp file per config, and stale ones are pruned."""
+    _, config_file = files
+    cache_dir = tmpdir / "cache" / "sync-with-uv"
+    other_lock = tmpdir / "other.lock"
+    with other_lock.open("w") as f:
+        f.write(LOCK_CONTENT)
+
+    _run(files)
+    _run((other_lock, config_file))
+    assert len(cache_dir.listdir()) == 1
+
+    stale = cache_dir / "stale.json"
+    with stale.open("w") as f:
+        f.write("{}")
+    expired = time.time() - main.STAMP_MAX_AGE - 1
+    os.utime(stale, (expired, expired))
+    _run(files)
+    assert not stale.exists()
+    assert len(cache_dir.listdir()) == 1
+
+
+def test_force(files: tuple[Path, Path], monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test --force bypasses the stamp check."""
+    assert _run(files) == 1
+    calls = _record_calls(monkeypatch)
+    assert _run(files, "--force") == 0
+    assert len(calls) == 1
+
+
+def test_skipped_run_imports(files: tuple[Path, Path], tmpdir: Path) -> None:
+    """Test a skipped run does not import the parsing dependencies."""
+    lock_file, config_file = files
+    assert _run(files) == 1
+    code = (
+        "import sys\n"
+        "from sync_with_uv.main import main\n"
+        f"assert main([{str(lock_file)!r}, '--config', {str(config_file)!r}]) == 0\n"
+        "print(sorted({'yaml', 'tomlkit', 'sync_with_uv.template'} & set(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=Path(__file__).parent.parent,
+        env={**os.environ, "XDG_CACHE_HOME": str(tmpdir / "cache")},
+        text=True,
+    )
+    assert result.stdout.strip() == "[]"
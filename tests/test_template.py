@@ -0,0 +1,189 @@
+"""Test rendering of `rev` templates from package versions."""
+
+import json
+import re
+from collections.abc import Callable
+from pathlib import Path
+
+import pytest
+
+from sync_with_uv import main, template
+from sync_with_uv.template import (
+    InvalidPlaceholderError,
+    InvalidSpecifierError,
+    InvalidTransformError,
+    InvalidTypeError,
+    RevTemplateError,
+    UnknownKeysError,
+    compile_rev,
+)
+from tests.helpers import CONFIG_CONTENT, CUSTOM_DEPENDENCY_MAPPING, LOCK_CONTENT
+
+REPO = "https://example.org/fakepackages/foobarbaz"
+
+
+@pytest.mark.parametrize(
+    "rev,version,expected",
+    [
+        ("${rev}", "0.910", "0.910"),
+        ("v${rev}", "0.910", "v0.910"),
+        ("v${public}", "1.2.0+local.1", "v1.2.0"),
+        ("${base}", "1.2.0rc1.post2.dev3+local", "1.2.0"),
+        ("${major}.${minor}", "3", "3.0"),
+        ("${micro}-${pre}-${post}-${dev}", "1.2.3rc1.post2.dev3", "3-rc1-post2-dev3"),
+        ("${local}", "1.0+ubuntu.1", "ubuntu.1"),
+        ("v${rev}", "not-a-version", "vnot-a-version"),
+    ],
+)
+def test_rev_template(rev: str, version: str, expected: str) -> None:
+    """Test PEP 440 placeholders."""
+    assert compile_rev({"repo": REPO, "rev": rev})(version) == expected
+
+
+def test_rev_transforms() -> None:
+    """Test regex transforms are applied to the rendered rev."""
+    render = compile_rev(
+        {
+            "repo": REPO,
+            "rev": "release-${base}",
+            "transforms": [{"pattern": "[.]", "replace": "_"}],
+        }
+    )
+    assert render("1.2.3") == "release-1_2_3"
+
+
+@pytest.mark.parametrize(
+    "version,expected",
+    [
+        ("0.9.1", "v0.9.1"),
+        ("1.0.0rc1", "mirror-1.0.0rc1"),
+        ("1.0.0", "release-1_0_0"),
+        ("1.9.9.post1", "release-1_9_9"),
+        ("2.0.dev1", "mirror-2.0.dev1"),
+        ("2.0", "2.0"),
+    ],
+)
+def test_rev_overrides(version: str, expected: str) -> None:
+    """Test the first override matching a version replaces rev and transforms."""
+    render = compile_rev(
+        {
+            "repo": REPO,
+            "rev": "${rev}",
+            "overrides": [
+                {"versions": "<1.0a0", "rev": "v${rev}"},
+                {"prerelease": True, "rev": "mirror-${rev}"},
+                {
+                    "versions": ">=1.0, <2",
+                    "rev": "release-${base}",
+                    "transforms": [{"pattern": "[.]", "replace": "_"}],
+                },
+            ],
+        }
+    )
+    assert render(version) == expected
+
+
+@pytest.mark.parametrize(
+    "versions,version,expected",
+    [
+        ("<2", "1.9", True),
+        ("<2", "2.0rc1", False),
+        ("<2", "2.0.dev1", False),
+        ("<2", "2.0a1", False),
+        ("<2.0rc2", "2.0rc1", True),
+        ("<2", "2.1a1", False),
+        (">1.0", "1.0.post1", False),
+        (">1.0", "1.0.1", True),
+        (">1.0.post1", "1.0.post2", True),
+        (">1.0rc1", "1.0", True),
+        ("<=2", "2.0rc1", True),
+        (">=1.0", "1.0.post1", True),
+        ("==1.0", "1.0.0", True),
+        ("!=1.0", "1.0.post1", True),
+    ],
+)
+def test_rev_override_specifiers(versions: str, version: str, expected: bool) -> None:
+    """Test version specifiers follow PEP 440, including exclusive bounds."""
+    render = compile_rev(
+        {
+            "repo": REPO,
+            "rev": "${rev}",
+            "overrides": [{"versions": versions, "rev": "x"}],
+        }
+    )
+    assert (render(version) == "x") is expected
+
+
+def test_compiled_once(tmpdir: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the mapping is compiled once for all the lock files of a run."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmpdir / "cache"))
+    lock_files = []
+    for i in range(3):
+        lock_file = tmpdir / f"uv{i}.lock"
+        with lock_file.open("w") as f:
+            f.write(LOCK_CONTENT)
+        lock_files.append(str(lock_file))
+    config_file = tmpdir / ".pre-commit-yaml"
+    with config_file.open("w") as f:
+        f.write(CONFIG_CONTENT)
+    db_file = tmpdir / "db.json"
+    with db_file.open("w") as f:
+        json.dump(CUSTOM_DEPENDENCY_MAPPING, f)
+
+    compiled = []
+
+    def _compile_rev(mapping: dict) -> Callable[[str], str]:
+        compiled.append(mapping)
+        return compile_rev(mapping)
+
+    monkeypatch.setattr(template, "compile_rev", _compile_rev)
+    main.main([*lock_files, "--config", str(config_file), "--db", str(db_file)])
+    assert compiled == list(CUSTOM_DEPENDENCY_MAPPING.values())
+
+
+def test_extra_entry_keys() -> None:
+    """Test unknown top-level entry keys are ignored, as they always were."""
+    render = compile_rev({"repo": REPO, "rev": "v${rev}", "description": "foo"})
+    assert render("1.0") == "v1.0"
+
+
+@pytest.mark.parametrize(
+    "entry,error",
+    [
+        ({"rev": "${rev}", "overrides": [{"versions": "~1"}]}, InvalidSpecifierError),
+        (
+            {"rev": "${rev}", "transforms": [{"pattern": "(a)", "replace": "\\9"}]},
+            InvalidTransformError,
+        ),
+        (
+            {"rev": "${rev}", "transforms": [{"pattern": "a", "replace": "\\g<x>"}]},
+            InvalidTransformError,
+        ),
+        ({"rev": "${rev}", "transforms": "abc"}, InvalidTypeError),
+        ({"rev": "${rev}", "transforms": ["abc"]}, InvalidTypeError),
+        ({"rev": "${rev}", "transforms": [{"replace": "a"}]}, InvalidTypeError),
+        ({"rev": "${rev}", "overrides": {"versions": "<1"}}, InvalidTypeError),
+        ({"rev": "${rev}", "overrides": [{"prerelease": "yes"}]}, InvalidTypeError),
+        ({"rev": "${rev}", "overrides": [{"versions": 1}]}, InvalidTypeError),
+        ({"rev": 1}, InvalidTypeError),
+        ({"rev": "${rev}", "overrides": [{"version": ">=5"}]}, UnknownKeysError),
+        ({"rev": "${rev}", "transforms": [{"regex": "a"}]}, UnknownKeysError),
+        ({"rev": "${rev}", "transforms": [{"pattern": "("}]}, InvalidTransformError),
+        ({"rev": "v${bse}"}, InvalidPlaceholderError),
+        ({"rev": "v$"}, InvalidPlaceholderError),
+    ],
+)
+def test_invalid_entry(entry: dict, error: type[RevTemplateError]) -> None:
+    """Test invalid mapping entries are reported, naming their repo."""
+    with pytest.raises(error, match=re.escape(REPO)):
+        compile_rev({"repo": REPO, **entry})
+
+
+def test_non_pep440_version() -> None:
+    """Test PEP 440 placeholders cannot render non-compliant versions."""
+    assert compile_rev({"repo": REPO, "rev": "v${rev}"})("2024.1-custom") == (
+        "v2024.1-custom"
+    )
+    render = compile_rev({"repo": REPO, "rev": "v${base}"})
+    with pytest.raises(InvalidPlaceholderError, match=re.escape("2024.1-custom")):
+        render("2024.1-custom")